@@ -0,0 +1,146 @@
+import asyncio
+import functools
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from typing import Any, TypeAlias
+
+import aiohttp
+
+from databricks_mcp.api.masking import MaskProjector, mask_api_response
+from databricks_mcp.api.utils import (
+    JsonData,
+    get_conditional_with_backoff,
+    get_with_backoff,
+    invalidate_conditional,
+    lru_store,
+)
+
+RESPONSE_CACHE_TTL_SECONDS = 60
+# A missing resource is remembered only briefly, so one that is created shortly after is found
+NOT_FOUND_CACHE_TTL_SECONDS = 5
+RESPONSE_CACHE_MAX_SIZE = 512
+# Responses with at least this many items in their top level lists are masked in a worker thread,
+# below that masking is quicker than the hop to the thread (a thousand rows take about 0.2 ms)
+MASK_IN_THREAD_MIN_ITEMS = 1000
+
+MaskedFetcher = Callable[..., Awaitable[JsonData]]
+
+Mask: TypeAlias = Mapping[str, Any] | MaskProjector
+
+# Masked API responses keyed by (endpoint, id(mask)), storing (expiry time, masked data or
+# the 404 error, mask), in least recently used order. The mask is kept alive with its entries,
+# so its id cannot be reused by another mask while they are cached.
+_response_cache: dict[tuple[str, int], tuple[float, JsonData | aiohttp.ClientResponseError, Mask]] = {}
+# Body digest and masked data of the last response of conditionally fetched endpoints, with the mask,
+# keyed by (endpoint, id(mask)), in least recently used order
+_masked_conditional: dict[tuple[str, int], tuple[bytes, JsonData, Mask]] = {}
+
+
+def async_cached(
+    ttl: float = RESPONSE_CACHE_TTL_SECONDS,
+    not_found_ttl: float = NOT_FOUND_CACHE_TTL_SECONDS,
+    maxsize: int = RESPONSE_CACHE_MAX_SIZE,
+) -> Callable[[MaskedFetcher], MaskedFetcher]:
+    """
+    Cache the result of a masked endpoint fetch for `ttl` seconds.
+
+    The cache key is the endpoint (including its query parameters) together with the identity
+    of the mask, so the same endpoint fetched with different masks is cached separately.
+    A 404 response is cached for `not_found_ttl` seconds and raised again on a hit, and at most
+    `maxsize` responses are kept, evicting the least recently used one.
+    The event loop is single threaded and the cache is only read and written between awaits,
+    so no lock is needed around the dictionary itself.
+    """
+
+    def decorator(fetch: MaskedFetcher) -> MaskedFetcher:
+        @functools.wraps(fetch)
+        async def wrapper(
+            session: aiohttp.ClientSession,
+            endpoint: str,
+            mask: Mask,
+            *,
+            conditional: bool = False,
+        ) -> JsonData:
+            key = (endpoint, id(mask))
+            cached = _response_cache.pop(key, None)
+            if cached is not None and time.monotonic() < cached[0]:
+                # Reinsert to mark the entry as most recently used
+                _response_cache[key] = cached
+                if isinstance(cached[1], aiohttp.ClientResponseError):
+                    raise cached[1].with_traceback(None)
+                return cached[1]
+            try:
+                data = await fetch(session, endpoint, mask, conditional=conditional)
+            except aiohttp.ClientResponseError as e:
+                if e.status == 404:
+                    _store(key, time.monotonic() + not_found_ttl, e, mask, maxsize)
+                raise
+            _store(key, time.monotonic() + ttl, data, mask, maxsize)
+            return data
+
+        return wrapper
+
+    return decorator
+
+
+def _store(
+    key: tuple[str, int],
+    expires_at: float,
+    value: JsonData | aiohttp.ClientResponseError,
+    mask: Mask,
+    maxsize: int,
+) -> None:
+    """Add a response to the cache, evicting the least recently used ones beyond `maxsize`."""
+    lru_store(_response_cache, key, (expires_at, value, mask), maxsize)
+
+
+def invalidate(prefix: str = "") -> None:
+    """
+    Drop all cached responses whose endpoint starts with `prefix` (everything by default).
+
+    The responses kept to revalidate conditionally fetched endpoints are dropped as well, so
+    they are fetched in full again.
+    """
+    for cache in (_response_cache, _masked_conditional):
+        for key in [key for key in cache if key[0].startswith(prefix)]:
+            del cache[key]
+    invalidate_conditional(prefix)
+
+
+@async_cached()
+async def get_masked_with_backoff(
+    session: aiohttp.ClientSession,
+    endpoint: str,
+    mask: Mask,
+    *,
+    conditional: bool = False,
+) -> JsonData:
+    """
+    Fetch an endpoint with `get_with_backoff` and mask the response, caching the masked result.
+
+    Masking a large listing is CPU bound, so it runs in a worker thread to keep the event loop
+    free for the other requests in flight. With `conditional=True` the endpoint is fetched as a conditional
+    request, and an unchanged response is neither decoded nor masked again. Only the masked
+    data is kept for that, not the full response.
+    """
+    if not conditional:
+        data = await get_with_backoff(session, endpoint)
+        return await _mask(data, mask)
+    key = (endpoint, id(mask))
+    previous = _masked_conditional.get(key)
+    response = await get_conditional_with_backoff(session, endpoint, previous[0] if previous is not None else None)
+    if response.data is None:
+        # Unchanged since the previous response was masked
+        lru_store(_masked_conditional, key, previous, RESPONSE_CACHE_MAX_SIZE)
+        return previous[1]
+    masked_data = await _mask(response.data, mask)
+    lru_store(_masked_conditional, key, (response.digest, masked_data, mask), RESPONSE_CACHE_MAX_SIZE)
+    return masked_data
+
+
+async def _mask(data: JsonData, mask: Mask) -> JsonData:
+    """Mask a response, in a worker thread when it is a listing of at least `MASK_IN_THREAD_MIN_ITEMS` items."""
+    items = len(data) if isinstance(data, list) else sum(len(value) for value in data.values() if isinstance(value, list))
+    if items < MASK_IN_THREAD_MIN_ITEMS:
+        return mask_api_response(data, mask)
+    return await asyncio.to_thread(mask_api_response, data, mask)
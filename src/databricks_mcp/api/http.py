@@ -0,0 +1,42 @@
+import asyncio
+
+import aiohttp
+
+# Shared client session, reused across tool calls so TCP and TLS connections to the
+# Databricks host are kept alive, and its DNS lookup cached, instead of being re-established on every request
+_session: aiohttp.ClientSession | None = None
+_session_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_shared_session(max_connections: int) -> aiohttp.ClientSession:
+    """
+    Get the client session shared by all API calls, creating it on first use.
+
+    The session is bound to the running event loop; a new session is created when it was
+    closed or when called from a different event loop. `max_connections` bounds the pool of
+    the session when it is created.
+    """
+    global _session, _session_loop  # noqa: PLW0603
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=max_connections,
+                limit_per_host=max_connections,
+                enable_cleanup_closed=True,
+                keepalive_timeout=300,
+                ttl_dns_cache=300,
+            ),
+            timeout=aiohttp.ClientTimeout(total=60, connect=10),
+        )
+        _session_loop = loop
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared client session, if one was created."""
+    global _session, _session_loop  # noqa: PLW0603
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
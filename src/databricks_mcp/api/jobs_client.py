@@ -1,48 +1,42 @@
-import asyncio
-import json
-from pathlib import Path
-
 import aiohttp
 
+from databricks_mcp.api.cache import get_masked_with_backoff
+from databricks_mcp.api.masking import load_mask
 from databricks_mcp.api.utils import (
     JsonData,
     ToolCallResponse,
+    bounded_map_unique,
     format_toolcall_response,
+    get_all_pages,
     get_async_session,
-    get_with_backoff,
-    mask_api_response,
 )
 
-# Load masks from JSON files
-_MASKS_DIR = Path(__file__).parent / "masks"
-
-with (_MASKS_DIR / "jobs_mask.json").open() as f:
-    jobs_mask = json.load(f)
-
-with (_MASKS_DIR / "jobs_details_mask.json").open() as f:
-    jobs_details_mask = json.load(f)
-
-with (_MASKS_DIR / "jobs_runs_mask.json").open() as f:
-    jobs_runs_mask = json.load(f)
+# Maximum number of jobs the jobs/list endpoint returns per page
+JOBS_PAGE_SIZE = 100
 
 
 async def _get_jobs_from_endpoint(
     session: aiohttp.ClientSession,
-    semaphore: asyncio.Semaphore,
 ) -> JsonData:
     """Get a list of jobs from the jobs/list endpoint.
 
+    Follows the endpoint's pagination, masking each page as it arrives so only one
+    unmasked page is held in memory at a time.
+
     Args:
         session: The aiohttp client session
-        semaphore: Semaphore for rate limiting requests
 
     Returns
     -------
         List of jobs from the API response
     """
-    data = await get_with_backoff(session, "jobs/list", semaphore)
-    masked_data = mask_api_response(data, jobs_mask)["jobs"]
-    return masked_data
+    mask = load_mask("jobs_mask")
+    return await get_all_pages(
+        lambda endpoint: get_masked_with_backoff(session, endpoint, mask),
+        f"jobs/list?limit={JOBS_PAGE_SIZE}",
+        "jobs",
+        has_more_key="has_more",
+    )
 
 
 async def get_jobs() -> ToolCallResponse:
@@ -56,8 +50,8 @@ async def get_jobs() -> ToolCallResponse:
         ToolCallResponse
     """
     try:
-        async with get_async_session() as (session, semaphore):
-            jobs = await _get_jobs_from_endpoint(session, semaphore)
+        async with get_async_session() as session:
+            jobs = await _get_jobs_from_endpoint(session)
             return format_toolcall_response(success=True, content=jobs)
 
     except Exception as e:
@@ -66,20 +60,18 @@ async def get_jobs() -> ToolCallResponse:
 
 async def _get_single_job_details(
     session: aiohttp.ClientSession,
-    semaphore: asyncio.Semaphore,
     job_id: int,
 ) -> JsonData:
     """Get details for a specific job
 
     Args:
         session: The aiohttp client session
-        semaphore: Semaphore for rate limiting requests
         job_id: ID of the job to get details for
     Returns:
         Dict containing job details
     """
-    data = await get_with_backoff(session, f"jobs/get?job_id={job_id}", semaphore)
-    masked_data = mask_api_response(data, jobs_details_mask)
+    endpoint = f"jobs/get?job_id={job_id}"
+    masked_data = await get_masked_with_backoff(session, endpoint, load_mask("jobs_details_mask"))
     return masked_data
 
 
@@ -96,10 +88,8 @@ async def get_job_details(job_ids: list[int]) -> ToolCallResponse:
         ToolCallResponse
     """
     try:
-        async with get_async_session() as (session, semaphore):
-            # Get details about multiple jobs concurrently
-            job_tasks = [_get_single_job_details(session, semaphore, job_id) for job_id in job_ids]
-            jobs_data = await asyncio.gather(*job_tasks)
+        async with get_async_session() as session:
+            jobs_data = await bounded_map_unique(lambda job_id: _get_single_job_details(session, job_id), job_ids)
             return format_toolcall_response(success=True, content=jobs_data)
 
     except Exception as e:
@@ -108,7 +98,6 @@ async def get_job_details(job_ids: list[int]) -> ToolCallResponse:
 
 async def _get_runs_for_single_job(
     session: aiohttp.ClientSession,
-    semaphore: asyncio.Semaphore,
     job_id: int,
     amount: int,
 ) -> JsonData:
@@ -116,17 +105,18 @@ async def _get_runs_for_single_job(
 
     Args:
         session: The aiohttp client session
-        semaphore: Semaphore for rate limiting requests
         job_id: ID of the job to get runs for
+        amount: Number of most recent runs to get
 
     Returns
     -------
         List of job runs
     """
-    data = await get_with_backoff(session, f"jobs/runs/list?job_id={job_id}", semaphore)
-    masked_data = mask_api_response(data, jobs_runs_mask)
+    # Let the API return only the most recent `amount` runs instead of a full page of history
+    endpoint = f"jobs/runs/list?job_id={job_id}&limit={amount}"
+    masked_data = await get_masked_with_backoff(session, endpoint, load_mask("jobs_runs_mask"))
     runs = masked_data.get("runs", [])
-    return runs[:amount]
+    return runs
 
 
 async def get_job_runs(job_ids: list[int], amount: int) -> ToolCallResponse:
@@ -142,9 +132,8 @@ async def get_job_runs(job_ids: list[int], amount: int) -> ToolCallResponse:
         ToolCallResponse
     """
     try:
-        async with get_async_session() as (session, semaphore):
-            job_tasks = [_get_runs_for_single_job(session, semaphore, job_id, amount) for job_id in job_ids]
-            jobs_data = await asyncio.gather(*job_tasks)
+        async with get_async_session() as session:
+            jobs_data = await bounded_map_unique(lambda job_id: _get_runs_for_single_job(session, job_id, amount), job_ids)
             return format_toolcall_response(success=True, content=jobs_data)
 
     except Exception as e:
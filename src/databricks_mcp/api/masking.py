@@ -0,0 +1,164 @@
+import functools
+import itertools
+from collections.abc import Callable, Iterator, Mapping
+from importlib.resources import files
+from types import MappingProxyType
+from typing import Any, TypeAlias
+
+import orjson
+
+from databricks_mcp.api.utils import JsonData
+
+MaskProjector: TypeAlias = Callable[[JsonData], JsonData]
+
+
+def compile_mask(mask: Mapping[str, Any]) -> MaskProjector:
+    """
+    Precompile a mask into a projector function that filters a response as described in `mask_api_response`.
+
+    The projector is generated as Python source specialised for the mask, with one function per
+    nested mask that looks up its known keys directly, and compiled once. Applying it therefore
+    does no iteration or type checking of the mask itself.
+    """
+    if not isinstance(mask, Mapping):
+        # Non-dict masks (e.g. `[]`) keep the data as is
+        return _keep
+    # Mask keys are passed in as constants rather than rendered into the source
+    namespace: dict[str, Any] = {"_MISSING": _MISSING, "_project_empty": _project_empty}
+    source: list[str] = []
+    name = _generate_projector(mask, source, namespace, itertools.count())
+    code = compile("\n".join(source), "<compiled mask>", "exec")
+    exec(code, namespace)  # noqa: S102  # nosec B102
+    return namespace[name]
+
+
+def _generate_projector(
+    mask: Mapping[str, Any],
+    source: list[str],
+    namespace: dict[str, Any],
+    counter: Iterator[int],
+) -> str:
+    """Append the source of the projector function for `mask` and its submasks to `source`, returning its name."""
+    name = f"_project_{next(counter)}"
+    lines = [
+        f"def {name}(data):",
+        "    if isinstance(data, dict):",
+        "        result = {}",
+    ]
+    key_names = [f"{name}_key_{index}" for index in range(len(mask))]
+    namespace.update(zip(key_names, mask, strict=True))
+    for key_name, submask in zip(key_names, mask.values(), strict=True):
+        if not isinstance(submask, Mapping):
+            value = "value"
+        elif not submask:
+            value = _leaf_source("value")
+        else:
+            value = f"{_generate_projector(submask, source, namespace, counter)}(value)"
+        lines += [
+            f"        value = data.get({key_name}, _MISSING)",
+            "        if value is not _MISSING:",
+            f"            result[{key_name}] = {value}",
+        ]
+    lines += [
+        "        return result",
+        "    if isinstance(data, list):",
+    ]
+    if mask and all(isinstance(submask, Mapping) and not submask for submask in mask.values()):
+        # Flat mask, as for the rows of a listing: build every row inline in a single comprehension,
+        # without a function call per row. A row that is not a dict or lacks one of the keys raises,
+        # and the list is then projected row by row instead.
+        items = ", ".join(
+            f"{key_name}: {_leaf_source(f'value_{index}', f'row[{key_name}]')}" for index, key_name in enumerate(key_names)
+        )
+        lines += [
+            "        try:",
+            f"            return [{{{items}}} for row in data]",
+            "        except (KeyError, TypeError):",
+            "            pass",
+        ]
+    lines += [
+        f"        return [{name}(item) for item in data]",
+        "    return data",
+    ]
+    source.extend(lines)
+    return name
+
+
+def _leaf_source(value: str, expression: str | None = None) -> str:
+    """
+    Source of the projection of `value` by an empty submask: scalars are kept, nested dicts are emptied.
+
+    If `expression` is given, it is evaluated and assigned to `value` first.
+    """
+    assigned = value if expression is None else f"({value} := {expression})"
+    return f"{value} if not isinstance({assigned}, (dict, list)) else _project_empty({value})"
+
+
+_MISSING = object()
+
+
+def _project_empty(data: JsonData) -> JsonData:
+    """Projector for an empty mask."""
+    if isinstance(data, dict):
+        return {}
+    if isinstance(data, list):
+        return [_project_empty(item) for item in data]
+    return data
+
+
+def _keep(data: JsonData) -> JsonData:
+    return data
+
+
+def _freeze(mask: object) -> object:
+    """Recursively wrap a mask in read-only mappings, so a compiled projector can never go stale."""
+    if isinstance(mask, dict):
+        return MappingProxyType({key: _freeze(submask) for key, submask in mask.items()})
+    return mask
+
+
+# Located through the package, so the masks are also found when it is not installed as plain files
+_MASKS_FILE = files("databricks_mcp.api").joinpath("masks", "masks.json")
+
+
+@functools.cache
+def _load_masks() -> Mapping[str, Mapping[str, Any]]:
+    """Read all masks from the bundled masks file in a single read and parse."""
+    return _freeze(orjson.loads(_MASKS_FILE.read_bytes()))
+
+
+@functools.cache
+def load_mask(name: str) -> MaskProjector:
+    """Get the mask `name` from the masks file, compiled on first use so importing a client does no file I/O."""
+    return compile_mask(_load_masks()[name])
+
+
+def mask_api_response(data: JsonData, mask: Mapping[str, Any] | MaskProjector) -> JsonData:
+    """
+    Recursively filter a nested api json response according to a mask.
+
+    The mask dictionary specifies which keys to keep:
+    - Keys in the mask should be kept in the output.
+    - If a mask key maps to another dict, the function recurses into that sub-dictionary to filter deeply.
+    - If data is list: apply mask to each element in the list.
+    - Non-dict and non-list values are returned as is if they match a mask key.
+
+    A mask precompiled with `compile_mask` (as returned by `load_mask`) is applied directly. Any
+    other mask is walked recursively, since compiling it would cost far more than one walk and
+    an ad-hoc mask may be changed between calls.
+    """
+    if callable(mask):
+        return mask(data)
+    if isinstance(data, dict) and isinstance(mask, Mapping):
+        filtered = {}
+        for key, submask in mask.items():
+            # Only keep the key if it exists in input data
+            if key in data:
+                # If mask[key] is a dict, recurse to filter nested structures
+                filtered[key] = mask_api_response(data[key], submask)
+        return filtered
+    if isinstance(data, list):
+        # Apply the mask recursively to each item in the list
+        return [mask_api_response(item, mask) for item in data]
+    # Base case: data is not a dict or list (leaf node), return it as is
+    return data
@@ -1,46 +1,70 @@
 import asyncio
-import json
+import logging
 import time
-from pathlib import Path
+from collections.abc import Awaitable, Callable
+from itertools import chain
 
 import aiohttp
-from rapidfuzz import process
+from rapidfuzz import fuzz, process, utils
 
+from databricks_mcp.api.cache import get_masked_with_backoff, invalidate
+from databricks_mcp.api.masking import load_mask
 from databricks_mcp.api.utils import (
+    JsonData,
     ToolCallResponse,
+    bounded_map,
+    bounded_map_unique,
+    env_number,
     format_toolcall_response,
+    get_all_pages,
     get_async_session,
-    get_with_backoff,
-    mask_api_response,
+    request_concurrency,
 )
 
-# Load masks from JSON files
-_MASKS_DIR = Path(__file__).parent / "masks"
-
-with (_MASKS_DIR / "catalog_mask.json").open() as f:
-    catalog_mask = json.load(f)
-
-with (_MASKS_DIR / "schemas_mask.json").open() as f:
-    schemas_mask = json.load(f)
-
-with (_MASKS_DIR / "tables_mask.json").open() as f:
-    tables_mask = json.load(f)
-
-with (_MASKS_DIR / "table_details_mask.json").open() as f:
-    table_details_mask = json.load(f)
+logger = logging.getLogger(__name__)
+
+# In-memory cache for table listings, per catalog: catalog name -> (timestamp, table names,
+# table names normalised for fuzzy matching)
+_table_cache: dict[str, tuple[float, list[str], list[str]]] = {}
+# Time the catalog list was last fetched, None until the cache is first filled
+_catalogs_timestamp: float | None = None
+# Table names and normalised table names over all cached catalogs, rebuilt after a catalog changes
+_table_index: tuple[list[str], list[str]] | None = None
+# Background refreshes in flight, keyed by catalog name (None for the catalog list)
+_refresh_tasks: dict[str | None, asyncio.Task[None]] = {}
+# How long table listings are cached before being refreshed, 10 minutes unless configured
+CACHE_TTL_SECONDS = env_number("DATABRICKS_MCP_CATALOG_TTL", 600.0, minimum=0.0)
+# Minimum similarity score (0-100) for a table to be returned by `find_tables_by_name`
+MATCH_SCORE_CUTOFF = 60
+# Statuses that concern a single table, not the request as a whole: forbidden and not found
+TABLE_ERROR_STATUSES = frozenset({403, 404})
+# Page size for the Unity Catalog list endpoints, 0 lets the server pick its recommended page length
+UC_PAGE_SIZE = 0
+
+
+async def _get_pages_from_endpoint(
+    session: aiohttp.ClientSession,
+    endpoint: str,
+    mask_name: str,
+    key: str,
+) -> list[JsonData]:
+    """
+    Get the items under `key` from all pages of a Unity Catalog list endpoint.
 
-# In-memory cache for table listings
-_table_cache: dict[str, list[str] | float | None] = {
-    "tables": [],
-    "timestamp": None,
-}
-CACHE_TTL_SECONDS = 600  # 10 minutes
+    Without `max_results` these endpoints return everything in one response, so the pages of
+    a large catalog are fetched and masked one at a time instead. Each page is revalidated
+    with a conditional request, since listings change slowly.
+    """
+    mask = load_mask(mask_name)
+    return await get_all_pages(
+        lambda page_endpoint: get_masked_with_backoff(session, page_endpoint, mask, conditional=True),
+        f"{endpoint}{'&' if '?' in endpoint else '?'}max_results={UC_PAGE_SIZE}",
+        key,
+    )
 
 
-async def _get_catalogs_from_endpoint(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore) -> list[str]:
-    data = await get_with_backoff(session, "unity-catalog/catalogs", semaphore)
-    masked_data = mask_api_response(data, catalog_mask)["catalogs"]
-    return masked_data
+async def _get_catalogs_from_endpoint(session: aiohttp.ClientSession) -> list[str]:
+    return await _get_pages_from_endpoint(session, "unity-catalog/catalogs", "catalog_mask", "catalogs")
 
 
 async def get_catalogs() -> ToolCallResponse:
@@ -54,8 +78,8 @@ async def get_catalogs() -> ToolCallResponse:
         or error information if the operation failed.
     """
     try:
-        async with get_async_session() as (session, semaphore):
-            data = await _get_catalogs_from_endpoint(session, semaphore)
+        async with get_async_session() as session:
+            data = await _get_catalogs_from_endpoint(session)
             return format_toolcall_response(success=True, content=data)
     except Exception as e:
         return format_toolcall_response(success=False, error=e)
@@ -63,19 +87,17 @@ async def get_catalogs() -> ToolCallResponse:
 
 async def _get_schemas_in_catalog_from_endpoint(
     session: aiohttp.ClientSession,
-    semaphore: asyncio.Semaphore,
     catalog_name: str,
 ) -> list[str]:
-    data = await get_with_backoff(session, f"unity-catalog/schemas?catalog_name={catalog_name}", semaphore)
-    masked_data = mask_api_response(data, schemas_mask)["schemas"]
-    return masked_data
+    endpoint = f"unity-catalog/schemas?catalog_name={catalog_name}"
+    return await _get_pages_from_endpoint(session, endpoint, "schemas_mask", "schemas")
 
 
 async def get_schemas_in_catalogs(catalog_names: list[str]) -> ToolCallResponse:
     """
     Retrieve all schemas from the specified catalogs.
 
-    Fetches schema information from multiple catalogs in parallel and returns
+    Fetches schema information from multiple catalogs concurrently and returns
     a flattened list of all schemas across the provided catalogs.
 
     Parameters
@@ -90,10 +112,14 @@ async def get_schemas_in_catalogs(catalog_names: list[str]) -> ToolCallResponse:
         specified catalogs if successful, or error information if the operation failed.
     """
     try:
-        async with get_async_session() as (session, semaphore):
-            schema_tasks = [_get_schemas_in_catalog_from_endpoint(session, semaphore, catalog) for catalog in catalog_names]
-            schemas_per_catalog = await asyncio.gather(*schema_tasks)
-            all_schemas = [schema for catalog_schemas in schemas_per_catalog for schema in catalog_schemas]
+        async with get_async_session() as session:
+            # Fetch concurrently, with a bounded number of live tasks
+            schemas = await bounded_map(
+                lambda catalog: _get_schemas_in_catalog_from_endpoint(session, catalog),
+                catalog_names,
+                concurrency=request_concurrency(),
+            )
+            all_schemas = list(chain.from_iterable(schemas))
             return format_toolcall_response(success=True, content=all_schemas)
     except Exception as e:
         return format_toolcall_response(success=False, error=e)
@@ -101,13 +127,23 @@ async def get_schemas_in_catalogs(catalog_names: list[str]) -> ToolCallResponse:
 
 async def _get_tables_in_scema_from_endpoint(
     session: aiohttp.ClientSession,
-    semaphore: asyncio.Semaphore,
-    catalog_schema: str,
+    catalog_name: str,
+    schema_name: str,
 ) -> list[str]:
-    catalog, schema = catalog_schema.split(".")
-    data = await get_with_backoff(session, f"unity-catalog/tables?catalog_name={catalog}&schema_name={schema}", semaphore)
-    masked_data = mask_api_response(data, tables_mask).get("tables", [])
-    return masked_data
+    # Only the table names are kept, so ask the API to leave out columns, properties and usernames
+    endpoint = (
+        f"unity-catalog/tables?catalog_name={catalog_name}&schema_name={schema_name}"
+        "&omit_columns=true&omit_properties=true&omit_username=true"
+    )
+    return await _get_pages_from_endpoint(session, endpoint, "tables_mask", "tables")
+
+
+def _split_catalog_schema(catalog_schema: str) -> tuple[str, str]:
+    """Split a catalog.schema string into its catalog and schema name."""
+    catalog_name, _, schema_name = catalog_schema.partition(".")
+    if not catalog_name or not schema_name or "." in schema_name:
+        raise ValueError(f"expected catalog.schema, got {catalog_schema!r}")
+    return catalog_name, schema_name
 
 
 async def get_tables_in_catalogs_schemas(catalog_schemas: list[str]) -> ToolCallResponse:
@@ -131,12 +167,16 @@ async def get_tables_in_catalogs_schemas(catalog_schemas: list[str]) -> ToolCall
         the operation failed.
     """
     try:
-        async with get_async_session() as (session, semaphore):
-            table_tasks = [
-                _get_tables_in_scema_from_endpoint(session, semaphore, catalog_schema) for catalog_schema in catalog_schemas
-            ]
-            tables_per_catalog_schema = await asyncio.gather(*table_tasks)
-            all_tables = [table for catalog_tables in tables_per_catalog_schema for table in catalog_tables]
+        async with get_async_session() as session:
+            # Check all names before fetching any of them
+            catalog_and_schema_names = [_split_catalog_schema(catalog_schema) for catalog_schema in catalog_schemas]
+            # Fetch concurrently, with a bounded number of live tasks
+            tables = await bounded_map(
+                lambda names: _get_tables_in_scema_from_endpoint(session, *names),
+                catalog_and_schema_names,
+                concurrency=request_concurrency(),
+            )
+            all_tables = list(chain.from_iterable(tables))
             return format_toolcall_response(success=True, content=all_tables)
     except Exception as e:
         return format_toolcall_response(success=False, error=e)
@@ -144,11 +184,17 @@ async def get_tables_in_catalogs_schemas(catalog_schemas: list[str]) -> ToolCall
 
 async def _get_table_details_from_endpoint(
     session: aiohttp.ClientSession,
-    semaphore: asyncio.Semaphore,
     full_table_name: str,
-) -> list[str]:
-    data = await get_with_backoff(session, f"unity-catalog/tables/{full_table_name}", semaphore)
-    masked_data = mask_api_response(data, table_details_mask)
+) -> JsonData:
+    endpoint = f"unity-catalog/tables/{full_table_name}"
+    try:
+        masked_data = await get_masked_with_backoff(session, endpoint, load_mask("table_details_mask"))
+    except aiohttp.ClientResponseError as e:
+        # A table that does not exist or cannot be read is reported in its place, rather than
+        # failing the details of all other tables. Other errors, such as an expired token, fail the call.
+        if e.status not in TABLE_ERROR_STATUSES:
+            raise
+        return {"full_name": full_table_name, "error": str(e)}
     return masked_data
 
 
@@ -157,7 +203,8 @@ async def get_tables_details(full_table_names: list[str]) -> ToolCallResponse:
     Retrieve detailed information for the specified tables.
 
     Fetches comprehensive metadata and configuration details for multiple tables
-    in parallel.
+    in parallel. A table that does not exist or that cannot be read (a 404 or 403)
+    gets an entry with its full name and the error instead.
 
     Parameters
     ----------
@@ -168,91 +215,177 @@ async def get_tables_details(full_table_names: list[str]) -> ToolCallResponse:
     Returns
     -------
     ToolCallResponse
-        A response object containing a list of detailed table information objects
-        if successful, or error information if the operation failed.
+        A response object containing a list of detailed table information objects,
+        in the order of `full_table_names`, if successful, or error information if
+        the operation failed.
     """
     try:
-        async with get_async_session() as (session, semaphore):
-            table_tasks = [
-                _get_table_details_from_endpoint(session, semaphore, full_table_name) for full_table_name in full_table_names
-            ]
-            tables_data = await asyncio.gather(*table_tasks)
+        async with get_async_session() as session:
+            tables_data = await bounded_map_unique(
+                lambda full_table_name: _get_table_details_from_endpoint(session, full_table_name),
+                full_table_names,
+            )
             return format_toolcall_response(success=True, content=tables_data)
     except Exception as e:
         return format_toolcall_response(success=False, error=e)
 
 
-async def _get_all_tables() -> list[str]:
+async def _catalog_pipeline(
+    session: aiohttp.ClientSession,
+    catalog_name: str,
+) -> list[str]:
     """
-    Helper function to retrieve all tables from all catalogs and schemas.
+    Retrieve all table names in a catalog, fetching its tables as soon as its schemas are known.
 
     Returns
     -------
     list[str]
-        List of all table names (full_name format), or empty list if error occurs.
+        List of all table names (full_name format) in the catalog.
     """
-    catalogs_response = await get_catalogs()
-    if not catalogs_response["success"] or not catalogs_response["content"]:
-        return []
+    schemas = await _get_schemas_in_catalog_from_endpoint(session, catalog_name)
+    # The catalog is already known, so strip it off the schema full_name instead of splitting on "."
+    schema_names = [schema["full_name"].removeprefix(f"{catalog_name}.") for schema in schemas]
+    async with asyncio.TaskGroup() as task_group:
+        table_tasks = [
+            task_group.create_task(_get_tables_in_scema_from_endpoint(session, catalog_name, schema_name))
+            for schema_name in schema_names
+        ]
+    return [table["full_name"] for task in table_tasks for table in task.result()]
 
-    catalog_names = [catalog["name"] for catalog in catalogs_response["content"]]
-    schemas_response = await get_schemas_in_catalogs(catalog_names)
-    if not schemas_response["success"] or not schemas_response["content"]:
-        return []
 
-    catalog_schemas = [schema["full_name"] for schema in schemas_response["content"]]
-    tables_response = await get_tables_in_catalogs_schemas(catalog_schemas)
-    if not tables_response["success"]:
-        return []
-    all_tables = [table["full_name"] for table in tables_response["content"]]
-    return all_tables
+def _store_catalog_tables(catalog_name: str, tables: list[str]) -> None:
+    """Cache the tables of a catalog, normalised once here so searches do not preprocess every table name again."""
+    global _table_index  # noqa: PLW0603
+    _table_cache[catalog_name] = (time.monotonic(), tables, [utils.default_process(table) for table in tables])
+    _table_index = None
 
 
-async def _get_all_tables_cached(force_refresh: bool = False) -> list[str]:
+async def _refresh_catalog(catalog_name: str) -> None:
+    """Fetch and cache the tables of a single catalog."""
+    async with get_async_session() as session:
+        tables = await _catalog_pipeline(session, catalog_name)
+    _store_catalog_tables(catalog_name, tables)
+
+
+async def _refresh_catalogs(refresh_tables: bool) -> None:
     """
-    Get all tables with in-memory caching support.
+    Fetch the catalog list, dropping removed catalogs from the cache and fetching the tables of new ones.
 
-    The cache is valid for 10 minutes. After expiration, the next call will
-    refresh the cache from the Databricks API.
+    Each catalog runs its own schema-then-tables pipeline, so a slow catalog does not hold
+    back the table requests of the others.
 
     Parameters
     ----------
-    force_refresh : bool, optional
-        If True, bypass the cache and force a refresh from the API.
-        Default is False.
+    refresh_tables : bool
+        If True, fetch the tables of all catalogs, not just the ones that are not cached yet.
+    """
+    global _catalogs_timestamp, _table_index  # noqa: PLW0603
+    async with get_async_session() as session:
+        catalog_names = [catalog["name"] for catalog in await _get_catalogs_from_endpoint(session)]
+        async with asyncio.TaskGroup() as task_group:
+            catalog_tasks = {
+                catalog_name: task_group.create_task(_catalog_pipeline(session, catalog_name))
+                for catalog_name in catalog_names
+                if refresh_tables or catalog_name not in _table_cache
+            }
+    for catalog_name in _table_cache.keys() - set(catalog_names):
+        del _table_cache[catalog_name]
+    for catalog_name, task in catalog_tasks.items():
+        _store_catalog_tables(catalog_name, task.result())
+    _catalogs_timestamp = time.monotonic()
+    _table_index = None
+
+
+async def _refresh_quietly(refresh: Awaitable[None]) -> None:
+    """Run a refresh, logging the error and keeping the cached tables as they are if it fails."""
+    try:
+        await refresh
+    except Exception:
+        logger.warning("Refreshing the table cache failed, keeping the cached tables", exc_info=True)
 
-    Returns
-    -------
-    list[str]
-        List of all table names (full_name format), or empty list if error occurs.
+
+def _refresh_in_background(key: str | None, refresh: Callable[..., Awaitable[None]], *args: object) -> None:
+    """Start `refresh(*args)` as a background task, unless a refresh for `key` is already running."""
+    if key in _refresh_tasks:
+        return
+    task = asyncio.create_task(_refresh_quietly(refresh(*args)))
+    _refresh_tasks[key] = task
+    task.add_done_callback(lambda _: _refresh_tasks.pop(key, None))
+
+
+def _get_table_index() -> tuple[list[str], list[str]]:
+    """Get the table names and normalised table names of all cached catalogs."""
+    global _table_index  # noqa: PLW0603
+    if _table_index is None:
+        entries = list(_table_cache.values())
+        _table_index = (
+            list(chain.from_iterable(tables for _, tables, _ in entries)),
+            list(chain.from_iterable(normalized_tables for _, _, normalized_tables in entries)),
+        )
+    return _table_index
+
+
+async def _get_all_tables_cached(force_refresh: bool | list[str] = False) -> tuple[list[str], list[str]]:
     """
-    current_time = time.time()
-    cache_timestamp = _table_cache["timestamp"]
-    cached_tables = _table_cache["tables"]
+    Get all tables with in-memory caching support.
 
-    # Check if cache is valid
-    if not force_refresh and cache_timestamp is not None and current_time - cache_timestamp < CACHE_TTL_SECONDS and cached_tables:
-        return cached_tables
+    Tables are cached per catalog. The first call fetches all catalogs from the Databricks API.
+    After that, cached tables are always returned immediately. If the catalog list or a catalog
+    is older than `CACHE_TTL_SECONDS` (10 minutes by default), it is refreshed in the background
+    for later calls. Only the catalogs that expired are fetched again.
 
-    # Refresh cache
-    all_tables = await _get_all_tables()
-    _table_cache["tables"] = all_tables
-    _table_cache["timestamp"] = current_time
+    Parameters
+    ----------
+    force_refresh : bool | list[str], optional
+        If True, bypass the cache and refresh all catalogs from the API. If a list of catalog
+        names, refresh only those catalogs. Default is False.
 
-    return all_tables
+    Returns
+    -------
+    tuple[list[str], list[str]]
+        All table names (full_name format) and their normalised names, or empty lists if
+        no tables could be fetched.
+    """
+    if force_refresh is True or _catalogs_timestamp is None:
+        # Refresh all catalogs, bypassing cached endpoint responses when a refresh is forced
+        if force_refresh is True:
+            invalidate("unity-catalog/")
+        await _refresh_quietly(_refresh_catalogs(refresh_tables=True))
+        return _get_table_index()
+
+    if force_refresh:
+        for catalog_name in force_refresh:
+            invalidate(f"unity-catalog/schemas?catalog_name={catalog_name}&")
+            invalidate(f"unity-catalog/tables?catalog_name={catalog_name}&")
+        await asyncio.gather(*(_refresh_quietly(_refresh_catalog(catalog_name)) for catalog_name in force_refresh))
+
+    # Serve the cached tables, refreshing whatever expired in the background
+    current_time = time.monotonic()
+    if current_time - _catalogs_timestamp >= CACHE_TTL_SECONDS:
+        _refresh_in_background(None, _refresh_catalogs, False)
+    for catalog_name, (timestamp, _, _) in list(_table_cache.items()):
+        if current_time - timestamp >= CACHE_TTL_SECONDS:
+            _refresh_in_background(catalog_name, _refresh_catalog, catalog_name)
+    return _get_table_index()
+
+
+async def prefetch_tables() -> None:
+    """Fill the table listing cache used by `find_tables_by_name`, if it is still empty."""
+    await _get_all_tables_cached()
 
 
 async def find_tables_by_name(
     search_term: str,
     limit: int = 10,
-    force_refresh: bool = False,
+    force_refresh: bool | list[str] = False,
 ) -> list[tuple[str, float]]:
     """
     Find tables by name using fuzzy matching with in-memory caching.
 
-    Tables are cached for 10 minutes to improve performance. The first call
+    Tables are cached per catalog to improve performance. The first call
     will fetch all tables from the API (may take several seconds), but
-    subsequent calls within the cache window will be nearly instantaneous.
+    subsequent calls will be nearly instantaneous; catalogs cached for more
+    than `CACHE_TTL_SECONDS` (10 minutes by default) are refreshed in the background.
 
     Parameters
     ----------
@@ -260,21 +393,41 @@ async def find_tables_by_name(
         The search string to match against table names.
     limit : int, optional
         Maximum number of results to return. Default is 10.
-    force_refresh : bool, optional
-        If True, bypass the cache and fetch fresh data from the API.
+    force_refresh : bool | list[str], optional
+        If True, bypass the cache and fetch fresh data from the API. If a list
+        of catalog names, fetch fresh data for those catalogs only.
         Default is False.
 
     Returns
     -------
     list[tuple[str, float]]
         A list of tuples containing (table_name, similarity_score) for the top matches,
-        sorted by similarity score (highest first). Scores range from 0 to 100.
+        sorted by similarity score (highest first). Scores range from 0 to 100, and
+        tables scoring below `MATCH_SCORE_CUTOFF` are left out. When at least `limit`
+        table names contain the search term, only those are considered.
     """
-    all_tables = await _get_all_tables_cached(force_refresh)
+    all_tables, normalized_tables = await _get_all_tables_cached(force_refresh)
     if not all_tables:
         return []
 
-    # Extract top matches with similarity scores
-    matches = process.extract(search_term, all_tables, limit=limit)
-
-    return matches
+    query = utils.default_process(search_term)
+    # Search terms are usually (part of) a table name, so when enough names contain the search term,
+    # only score those instead of the whole workspace
+    choices: list[str] | dict[int, str] = {
+        index: normalized_table for index, normalized_table in enumerate(normalized_tables) if query in normalized_table
+    }
+    if not query or len(choices) < limit:
+        choices = normalized_tables
+
+    # Extract top matches with similarity scores against the pre-normalised names,
+    # then map them back to the original table names
+    matches = process.extract(
+        query,
+        choices,
+        scorer=fuzz.WRatio,
+        processor=None,
+        limit=limit,
+        score_cutoff=MATCH_SCORE_CUTOFF,
+    )
+
+    return [(all_tables[index], score) for _, score, index in matches]
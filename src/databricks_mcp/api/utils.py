@@ -1,22 +1,123 @@
 import asyncio
+import functools
+import hashlib
+import logging
+import math
 import os
-from collections.abc import AsyncIterator
+import random
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Mapping
 from contextlib import asynccontextmanager
-from dataclasses import dataclass
-from typing import Any, TypeAlias, TypedDict
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, NamedTuple, TypeAlias, TypedDict, TypeVar
+from urllib.parse import quote
 
 import aiohttp
+import orjson
+
+from databricks_mcp.api.http import get_shared_session
+
+logger = logging.getLogger(__name__)
+
+N = TypeVar("N", int, float)
+
+
+def env_number(name: str, default: N, minimum: N) -> N:
+    """
+    Read a numeric setting of the same type as `default` from the environment variable `name`.
+
+    When the variable is not set, is not a finite number of that type or is below `minimum`,
+    `default` is used instead. An invalid value is logged rather than raised, so a misconfigured
+    setting does not stop the server from starting.
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        number = type(default)(value)
+    except ValueError:
+        number = None
+    if number is None or not math.isfinite(number) or number < minimum:
+        logger.warning("Invalid %s=%r, expected a number of at least %s. Using %s instead.", name, value, minimum, default)
+        return default
+    return number
 
 
 @dataclass
 class AsyncClientConfig:
-    """Configuration for async HTTP client."""
+    """
+    Configuration for async HTTP client.
+
+    The maximum concurrency can be set with the `DATABRICKS_MCP_MAX_CONCURRENCY` environment variable.
+    """
 
     max_concurrent_requests: int = 8
+    max_adaptive_concurrency: int = field(default_factory=lambda: env_number("DATABRICKS_MCP_MAX_CONCURRENCY", 20, minimum=1))
     max_retries: int = 5
     base_delay: float = 0.5
 
 
+class AdaptiveLimiter:
+    """
+    Concurrency limiter that adapts its limit to how Databricks handles the load (AIMD).
+
+    Used like a semaphore (`async with limiter:`). The limit grows by one after every
+    `increase_after` consecutive successful requests, up to `max_limit`, and shrinks by
+    `overload_rate` (multiplicatively) whenever a request is rate limited with a 429.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        max_limit: int,
+        min_limit: int = 1,
+        increase_after: int = 10,
+        overload_rate: float = 0.1,
+    ) -> None:
+        self._limit = float(min(initial_limit, max_limit))
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._increase_after = increase_after
+        self._overload_rate = overload_rate
+        self._successes = 0
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        """The current number of requests allowed to run concurrently."""
+        return int(self._limit)
+
+    def on_success(self) -> None:
+        """Record a successful request, increasing the limit after enough consecutive successes."""
+        self._successes += 1
+        if self._successes >= self._increase_after:
+            self._successes = 0
+            self._limit = min(self._max_limit, self._limit + 1)
+
+    def on_overload(self) -> None:
+        """Record a rate limited request, decreasing the limit."""
+        self._successes = 0
+        self._limit = max(self._min_limit, self._limit * (1 - self._overload_rate))
+
+    async def __aenter__(self) -> None:
+        """Wait until fewer than `limit` requests are in flight, then take a slot."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def __aexit__(self, *_exc_info: object) -> None:
+        """Release the slot and wake up as many waiters as there are free slots."""
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify(max(self.limit - self._in_flight, 0))
+
+
+_config = AsyncClientConfig()
+# Shared by all tool calls, so what it learns about Databricks rate limiting carries over between calls
+_limiter = AdaptiveLimiter(_config.max_concurrent_requests, _config.max_adaptive_concurrency)
+
+
 class ToolCallResponse(TypedDict):
     """Response structure for MCP tool calls."""
 
@@ -26,33 +127,30 @@ class ToolCallResponse(TypedDict):
 
 
 @asynccontextmanager
-async def get_async_session() -> AsyncIterator[tuple[aiohttp.ClientSession, asyncio.Semaphore]]:
-    """Context manager for Unity Catalog session handling."""
-    config = AsyncClientConfig()
-    semaphore = asyncio.Semaphore(config.max_concurrent_requests)
-    async with aiohttp.ClientSession() as session:
-        yield session, semaphore
+async def get_async_session() -> AsyncIterator[aiohttp.ClientSession]:
+    """
+    Context manager for Unity Catalog session handling.
 
+    Yields the shared client session, which is left open on exit so its connection pool
+    is reused by the next tool call. Its connector allows as many connections as the
+    adaptive limiter can let through, so requests only ever wait on the limiter.
+    """
+    yield get_shared_session(max_connections=_config.max_adaptive_concurrency)
 
-class MaxRetriesExceededError(Exception):
-    """Raised when maximum retries are exceeded."""
 
+def request_concurrency() -> int:
+    """Get the number of requests the adaptive limiter currently lets run concurrently."""
+    return _limiter.limit
 
-async def get_with_backoff(
-    session: aiohttp.ClientSession,
-    endpoint: str,
-    semaphore: asyncio.Semaphore,
-    max_retries: int = 5,
-    base_delay: float = 0.5,
-    additional_headers: dict[str, str] | None = None,
-) -> dict[str, Any]:
+
+@functools.cache
+def _databricks_api() -> tuple[str, Mapping[str, str]]:
     """
-    Asynchronously fetches JSON data from a given URL using an aiohttp ClientSession.
+    Get the base URL of the Databricks REST API and the headers sent with every request.
 
-    Includes automatic retries and exponential backoff on HTTP 429 (Too Many Requests) responses.
+    The host and token are read from the environment on first use only. When either is
+    missing a ValueError is raised, and the environment is read again on the next call.
     """
-    if additional_headers is None:
-        additional_headers = {}
     databricks_host = os.getenv("DATABRICKS_HOST")
     databricks_token = os.getenv("DATABRICKS_TOKEN")
     missing_host_msg = "DATABRICKS_HOST environment variable is not set"
@@ -61,65 +159,277 @@ async def get_with_backoff(
     missing_auth_msg = "DATABRICKS_TOKEN environment variable is not set"
     if databricks_token is None:
         raise ValueError(missing_auth_msg)
-
-    url = f"{databricks_host}/api/2.1/{endpoint}"
     headers = {
         "Authorization": f"Bearer {databricks_token}",
         "Content-Type": "application/json",
     }
-    headers.update(additional_headers)
+    return f"{databricks_host}/api/2.1/", MappingProxyType(headers)
+
+
+class MaxRetriesExceededError(Exception):
+    """Raised when maximum retries are exceeded."""
+
+
+class ConditionalResponse(NamedTuple):
+    """Response to a conditional request: the digest of its body and the decoded body, None when it is unchanged."""
+
+    digest: bytes
+    data: dict[str, Any] | None
+
+
+# Requests currently in flight, keyed by endpoint, additional headers and the digest a conditional request compares to
+_inflight: dict[tuple[str, frozenset[tuple[str, str]], bytes | None], asyncio.Task[Any]] = {}
+
+# ETag and body digest of the last response of conditionally fetched endpoints, keyed by endpoint,
+# in least recently used order. Only these are kept, not the body itself.
+_conditional_cache: dict[str, tuple[str | None, bytes]] = {}
+CONDITIONAL_CACHE_MAX_SIZE = 512
+
+K = TypeVar("K")
+V = TypeVar("V")
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def lru_store(cache: dict[K, V], key: K, value: V, maxsize: int) -> None:
+    """Add `value` to `cache` as its most recently used entry, evicting the least recently used ones beyond `maxsize`."""
+    cache.pop(key, None)
+    cache[key] = value
+    while len(cache) > maxsize:
+        del cache[next(iter(cache))]
+
+
+def invalidate_conditional(prefix: str = "") -> None:
+    """Drop the kept ETags of conditionally fetched endpoints starting with `prefix` (all of them by default)."""
+    for endpoint in [endpoint for endpoint in _conditional_cache if endpoint.startswith(prefix)]:
+        del _conditional_cache[endpoint]
+
+
+async def get_with_backoff(
+    session: aiohttp.ClientSession,
+    endpoint: str,
+    max_retries: int = 5,
+    base_delay: float = 0.5,
+    additional_headers: dict[str, str] | None = None,
+) -> dict[str, Any]:
+    """
+    Asynchronously fetches JSON data from a given URL using an aiohttp ClientSession.
+
+    Includes automatic retries with jittered exponential backoff on HTTP 429 (Too Many Requests)
+    and 5xx responses, waiting as long as the `Retry-After` header asks for when it is present.
+    Requests are gated by the shared adaptive limiter, which backs off when Databricks rate limits.
+    Concurrent calls for the same endpoint share a single in-flight request.
+    """
+    key = (endpoint, frozenset((additional_headers or {}).items()), None)
+    return await _shared_request(
+        key,
+        lambda: _get_with_backoff(session, endpoint, max_retries, base_delay, additional_headers, None, conditional=False),
+    )
+
+
+async def get_conditional_with_backoff(
+    session: aiohttp.ClientSession,
+    endpoint: str,
+    known_digest: bytes | None,
+    max_retries: int = 5,
+    base_delay: float = 0.5,
+) -> ConditionalResponse:
+    """
+    Fetch an endpoint like `get_with_backoff`, skipping the decoding when the response did not change.
+
+    `known_digest` is the digest of the response the caller already has, if any. The request is
+    sent with `If-None-Match` when the API gave an ETag for that response, and on a 304, or when
+    the new body has the same digest, no data is returned. Only the ETag and the digest of the
+    last response are kept, so the caller keeps whatever it needs from the response itself.
+    """
+    # A conditional request is never shared with a plain one, whose key ends in None
+    key = (endpoint, frozenset(), known_digest or b"")
+    return await _shared_request(
+        key,
+        lambda: _get_with_backoff(session, endpoint, max_retries, base_delay, None, known_digest, conditional=True),
+    )
+
+
+async def _shared_request(key: tuple[str, frozenset[tuple[str, str]], bytes | None], request: Callable[[], Awaitable[T]]) -> T:
+    """Await the request in flight for `key`, starting `request()` when there is none."""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(request())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shield the shared request so one cancelled caller does not cancel it for the others
+    return await asyncio.shield(task)
+
+
+async def cancel_inflight_requests() -> None:
+    """Cancel the requests still in flight and wait for them to finish, so none of them outlives the shared session."""
+    tasks = list(_inflight.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _get_with_backoff(
+    session: aiohttp.ClientSession,
+    endpoint: str,
+    max_retries: int,
+    base_delay: float,
+    additional_headers: dict[str, str] | None,
+    known_digest: bytes | None,
+    *,
+    conditional: bool,
+) -> dict[str, Any] | ConditionalResponse:
+    base_url, headers = _databricks_api()
+    url = base_url + endpoint
+    # Only revalidate when the last response is the one the caller has, since a 304 carries no body
+    previous = _conditional_cache.get(endpoint) if conditional else None
+    etag = previous[0] if previous is not None and previous[1] == known_digest else None
+    if additional_headers or etag is not None:
+        headers = {**headers, **(additional_headers or {})}
+        if etag is not None:
+            headers["If-None-Match"] = etag
     delay = base_delay
-    for _ in range(max_retries):
-        async with semaphore, session.get(url, headers=headers) as response:
-            if response.status == 429:
-                print(
-                    f"429 Too Many Requests for {url}. Retrying in {delay} seconds...",
-                )
-                await asyncio.sleep(delay)
-                delay *= 2  # Exponential backoff
-                continue
-            response.raise_for_status()
-            return await response.json()
+    for attempt in range(max_retries):
+        async with _limiter, session.get(url, headers=headers) as response:
+            if etag is not None and response.status == 304:
+                _limiter.on_success()
+                lru_store(_conditional_cache, endpoint, previous, CONDITIONAL_CACHE_MAX_SIZE)
+                return ConditionalResponse(previous[1], None)
+            # Server errors are transient more often than not, so retry them too, except on the last attempt
+            retry = response.status == 429 or (response.status >= 500 and attempt < max_retries - 1)
+            if not retry:
+                response.raise_for_status()
+                body = await response.read()
+                _limiter.on_success()
+                if not conditional:
+                    # Decode the raw body with orjson instead of aiohttp's stdlib json based `response.json()`
+                    return orjson.loads(body)
+                return _decode_conditional(endpoint, body, response.headers.get("ETag"), known_digest)
+            if response.status in (429, 503):
+                _limiter.on_overload()
+            retry_delay = _retry_delay(response, delay)
+        # Back off outside the limiter, so the slot is free for other requests
+        logger.warning("%s for %s. Retrying in %.2f seconds...", response.status, url, retry_delay)
+        await asyncio.sleep(retry_delay)
+        delay *= 2  # Exponential backoff
     raise MaxRetriesExceededError(f"Max retries {max_retries} exceeded for URL: {url}")
 
 
+def _decode_conditional(endpoint: str, body: bytes, etag: str | None, known_digest: bytes | None) -> ConditionalResponse:
+    """Decode the body of a conditional request, unless it has the digest the caller already knows."""
+    digest = hashlib.blake2b(body, digest_size=16).digest()
+    lru_store(_conditional_cache, endpoint, (etag, digest), CONDITIONAL_CACHE_MAX_SIZE)
+    if digest == known_digest:
+        return ConditionalResponse(digest, None)
+    return ConditionalResponse(digest, orjson.loads(body))
+
+
+# Longest wait before a retry that a `Retry-After` header can ask for
+MAX_RETRY_AFTER_SECONDS = 30.0
+
+
+def _retry_delay(response: aiohttp.ClientResponse, delay: float) -> float:
+    """
+    Get how long to wait before retrying a request.
+
+    Uses the number of seconds in the `Retry-After` header when the API sent one, capped at
+    `MAX_RETRY_AFTER_SECONDS`, otherwise the exponential backoff `delay`. Either is jittered,
+    so requests that were rejected together do not all retry at the same moment.
+    """
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        delay = min(float(retry_after), MAX_RETRY_AFTER_SECONDS)
+    return delay * random.uniform(0.8, 1.2)  # noqa: S311  # nosec B311
+
+
+async def bounded_map(fn: Callable[[T], Awaitable[R]], items: Iterable[T], concurrency: int) -> list[R]:
+    """
+    Asynchronously apply `fn` to every item with at most `concurrency` calls in flight.
+
+    Instead of creating one task per item up front, `concurrency` workers pull items from a
+    queue, so the number of live tasks stays bounded for large inputs. Results are returned
+    in the order of `items`. At least one worker is started, so every result is always filled in.
+    """
+    queue: asyncio.Queue[tuple[int, T]] = asyncio.Queue()
+    for entry in enumerate(items):
+        queue.put_nowait(entry)
+    results: list[Any] = [None] * queue.qsize()
+
+    async def worker() -> None:
+        while not queue.empty():
+            index, item = queue.get_nowait()
+            results[index] = await fn(item)
+
+    async with asyncio.TaskGroup() as task_group:
+        for _ in range(min(max(1, concurrency), len(results))):
+            task_group.create_task(worker())
+    return results
+
+
+async def bounded_map_unique(fn: Callable[[T], Awaitable[R]], items: Iterable[T]) -> list[R]:
+    """
+    Apply `fn` once to every distinct item with `bounded_map`, as many at a time as the adaptive limiter allows.
+
+    A result is still returned for every item, in the order of `items`, so a repeated item gets
+    the result of its first occurrence.
+    """
+    items = list(items)
+    unique_items = list(dict.fromkeys(items))
+    unique_results = await bounded_map(fn, unique_items, concurrency=request_concurrency())
+    results_by_item = dict(zip(unique_items, unique_results, strict=True))
+    return [results_by_item[item] for item in items]
+
+
+async def get_all_pages(
+    fetch_page: Callable[[str], Awaitable[dict[str, Any]]],
+    endpoint: str,
+    key: str,
+    has_more_key: str | None = None,
+) -> list[Any]:
+    """
+    Get the items under `key` from all pages of a paginated list endpoint.
+
+    `fetch_page` fetches (and masks) a single page, so only one unmasked page is held in memory
+    at a time. Pages are followed through their `next_page_token`, until a page has no token or,
+    for endpoints that flag it separately, its `has_more_key` is false.
+    """
+    items = []
+    page_endpoint = endpoint
+    while True:
+        page = await fetch_page(page_endpoint)
+        # The items key is left out of the response when there are none
+        items.extend(page.get(key, []))
+        token = page.get("next_page_token")
+        if not token or (has_more_key is not None and not page.get(has_more_key)):
+            return items
+        # The token is opaque and may contain characters such as "+" and "&", so it is URL-encoded
+        page_endpoint = f"{endpoint}&page_token={quote(token, safe='')}"
+
+
+def _leaf_exceptions(error: BaseException) -> list[BaseException]:
+    """Flatten (nested) exception groups into the exceptions they contain."""
+    if isinstance(error, BaseExceptionGroup):
+        return [leaf for sub_error in error.exceptions for leaf in _leaf_exceptions(sub_error)]
+    return [error]
+
+
 def format_toolcall_response(
     success: bool,
     content: object | None = None,
     error: Exception | None = None,
 ) -> ToolCallResponse:
     """Format a tool call response into a standardized dictionary structure that gets fed into the LLM."""
+    if isinstance(error, ExceptionGroup):
+        # Report the errors raised inside a TaskGroup rather than the generic group message
+        error_message = "; ".join(str(sub_error) for sub_error in _leaf_exceptions(error))
+    else:
+        error_message = str(error) if error else None
     response: ToolCallResponse = {
         "success": success,
         "content": content,
-        "error": str(error) if error else None,
+        "error": error_message,
     }
     return response
 
 
 JsonData: TypeAlias = dict[str, Any] | list["JsonData"]
-
-
-def mask_api_response(data: JsonData, mask: dict[str, Any]) -> JsonData:
-    """
-    Recursively filter a nested api json response according to a mask.
-
-    The mask dictionary specifies which keys to keep:
-    - Keys in the mask should be kept in the output.
-    - If a mask key maps to another dict, the function recurses into that sub-dictionary to filter deeply.
-    - If data is list: apply mask to each element in the list.
-    - Non-dict and non-list values are returned as is if they match a mask key.
-    """
-    if isinstance(data, dict) and isinstance(mask, dict):
-        filtered = {}
-        for key, submask in mask.items():
-            # Only keep the key if it exists in input data
-            if key in data:
-                # If mask[key] is a dict, recurse to filter nested structures
-                filtered[key] = mask_api_response(data[key], submask)
-        return filtered
-    if isinstance(data, list):
-        # Apply the mask recursively to each item in the list
-        return [mask_api_response(item, mask) for item in data]
-    # Base case: data is not a dict or list (leaf node), return it as is
-    return data
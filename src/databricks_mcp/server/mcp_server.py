@@ -1,95 +1,144 @@
+import asyncio
+import contextlib
+import os
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Annotated, Final
+
 from mcp.server import FastMCP
+from pydantic import Field
 
 from databricks_mcp.api import jobs_client, unity_catalog_client
-from databricks_mcp.api.utils import ToolCallResponse
+from databricks_mcp.api.http import close_session
+from databricks_mcp.api.utils import ToolCallResponse, cancel_inflight_requests
+
+
+@asynccontextmanager
+async def _lifespan(_server: FastMCP) -> AsyncIterator[None]:
+    """
+    Set up the event loop for the server and close the shared HTTP session when it shuts down.
+
+    On Python 3.12+ tasks are started eagerly, so a request that is answered from a cache
+    completes without a round trip through the event loop. With `DATABRICKS_MCP_WARMUP=1`
+    the caches are filled in the background as soon as the server starts. On shutdown the
+    warmup and the requests still in flight are cancelled before the session is closed.
+    """
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+    # Optionally fill the caches while the client is still connecting
+    warmup = asyncio.create_task(_warmup()) if os.getenv("DATABRICKS_MCP_WARMUP") == "1" else None
+    try:
+        yield
+    finally:
+        if warmup is not None:
+            warmup.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await warmup
+        # The requests are shared between callers and shielded from them, so they are cancelled separately
+        await cancel_inflight_requests()
+        await close_session()
+
+
+async def _warmup() -> None:
+    """Fetch the table listing and the jobs, so the first tool calls are answered from the caches."""
+    await asyncio.gather(unity_catalog_client.prefetch_tables(), jobs_client.get_jobs(), return_exceptions=True)
+
+
+# Maximum number of recent runs get-job-runs returns per job
+MAX_N_RECENT: Final = 5
+
+
+async def get_job_runs(
+    job_ids: list[int],
+    n_recent: Annotated[int, Field(ge=1, le=MAX_N_RECENT)] = 1,
+) -> ToolCallResponse:
+    """
+    Get the `n_recent` most recent runs of each job, between 1 and `MAX_N_RECENT` runs per job.
+
+    The bounds are part of the tool's parameter schema, so FastMCP rejects an invalid
+    `n_recent` while validating the arguments, before this coroutine is even created.
+    """
+    return await jobs_client.get_job_runs(job_ids, n_recent)
+
+
+# The MCP tools as (name, function, description). The functions are registered as tools directly,
+# so their signatures define the tool parameters and the descriptions are what the LLM gets to see.
+TOOLS: tuple[tuple[str, Callable[..., Awaitable[object]], str], ...] = (
+    (
+        "get-catalogs",
+        unity_catalog_client.get_catalogs,
+        "Retrieve a list of all available catalogs in the Databricks workspace",
+    ),
+    (
+        "get-schemas-in-catalogs",
+        unity_catalog_client.get_schemas_in_catalogs,
+        """Retrieve a list of all available schemas in the given catalogs.
+
+Args:
+    - catalog_names: List of catalog names to get schemas for""",
+    ),
+    (
+        "get-tables-in-catalogs-schemas",
+        unity_catalog_client.get_tables_in_catalogs_schemas,
+        """Retrieve a list of all tables in the given catalogs and schemas.
+
+Args:
+    - catalog_schemas: List of catalog.schema strings to get tables for""",
+    ),
+    (
+        "get-tables-details",
+        unity_catalog_client.get_tables_details,
+        """Retrieve detailed information for the given tables.
+
+Args:
+    - full_table_names: List of full table names in the format catalog.schema.table to get details for""",
+    ),
+    (
+        "find-tables-by-name",
+        unity_catalog_client.find_tables_by_name,
+        """Find tables by name in Unity Catalog using fuzzy matching with in-memory caching.
+
+Args:
+    - search_term: The search term to find tables by
+    - limit: The maximum number of results to return
+    - force_refresh: If True, bypass the cache and fetch fresh data from the API;
+      if a list of catalog names, fetch fresh data for those catalogs only""",
+    ),
+    (
+        "get-jobs",
+        jobs_client.get_jobs,
+        "Retrieve a list of all jobs in the workspace",
+    ),
+    (
+        "get-job-details",
+        jobs_client.get_job_details,
+        """Get job details like settings and tasks by the job id.
+
+Args:
+    - List of integer job IDs""",
+    ),
+    (
+        "get-job-runs",
+        get_job_runs,
+        """Get recent job runs by job id.
+
+Args:
+    - job_ids: List of job ids for which to get the runs
+    - n_recent: Amount of runs to get per job, sorted by most recent""",
+    ),
+)
 
 
 class DatabricksMCPServer(FastMCP):
     """MCP server for Databricks Unity Catalog and Jobs API."""
 
     def __init__(self) -> None:
-        super().__init__("RevoData Databricks MCP")
+        super().__init__("RevoData Databricks MCP", lifespan=_lifespan)
         self._register_mcp_tools()
 
     def _register_mcp_tools(self) -> None:
-        @self.tool(name="get-catalogs")
-        async def get_catalogs() -> ToolCallResponse:
-            """Retrieve a list of all available catalogs in the Databricks workspace"""
-            return await unity_catalog_client.get_catalogs()
-
-        @self.tool(name="get-schemas-in-catalogs")
-        async def get_schemas_in_catalogs(catalog_names: list[str]) -> ToolCallResponse:
-            """
-            Retrieve a list of all available schemas in the given catalogs.
-
-            Args:
-                - catalog_names: List of catalog names to get schemas for
-            """
-            return await unity_catalog_client.get_schemas_in_catalogs(catalog_names)
-
-        @self.tool(name="get-tables-in-catalogs-schemas")
-        async def get_tables_in_catalogs_schemas(catalog_schemas: list[str]) -> ToolCallResponse:
-            """
-            Retrieve a list of all tables in the given catalogs and schemas.
-
-            Args:
-                - catalog_schemas: List of catalog.schema strings to get tables for
-            """
-            return await unity_catalog_client.get_tables_in_catalogs_schemas(catalog_schemas)
-
-        @self.tool(name="get-tables-details")
-        async def get_tables_details(full_table_names: list[str]) -> ToolCallResponse:
-            """
-            Retrieve detailed information for the given tables.
-
-            Args:
-                - full_table_names: List of full table names in the format catalog.schema.table to get details for
-            """
-            return await unity_catalog_client.get_tables_details(full_table_names)
-
-        @self.tool(name="find-tables-by-name")
-        async def find_tables_by_name(search_term: str, limit: int = 10, force_refresh: bool = False) -> ToolCallResponse:
-            """
-            Find tables by name in Unity Catalog using fuzzy matching with in-memory caching.
-
-            Args:
-                - search_term: The search term to find tables by
-                - limit: The maximum number of results to return
-                - force_refresh: If True, bypass the cache and fetch fresh data from the API
-            """
-            return await unity_catalog_client.find_tables_by_name(search_term, limit, force_refresh)
-
-        @self.tool(name="get-jobs")
-        async def get_jobs_in_workspace() -> ToolCallResponse:
-            """Retrieve a list of all jobs in the workspace"""
-            return await jobs_client.get_jobs()
-
-        @self.tool(name="get-job-details")
-        async def get_job_details(job_ids: list[int]) -> ToolCallResponse:
-            """
-            Get job details like settings and tasks by the job id.
-
-            Args:
-                - List of integer job IDs
-            """
-            return await jobs_client.get_job_details(job_ids)
-
-        @self.tool(name="get-job-runs")
-        async def get_job_runs(
-            job_ids: list[int],
-            n_recent: int = 1,
-        ) -> ToolCallResponse:
-            """
-            Get recent job runs by job id.
-
-            Args:
-                - job_ids: List of job ids for which to get the runs
-                - amount: Amount of runs to get per job, sorted by most recent
-            """
-            max_n_recent = 5
-            if n_recent > max_n_recent:
-                raise ValueError(f"n_recent cannot exceed {max_n_recent}")
-            return await jobs_client.get_job_runs(job_ids, n_recent)
+        for name, function, description in TOOLS:
+            self.add_tool(function, name=name, description=description)
 
 
 def main() -> None:
@@ -0,0 +1,80 @@
+import random
+import unittest
+from collections.abc import Mapping
+
+from databricks_mcp.api.masking import _load_masks, compile_mask, load_mask, mask_api_response
+
+KEYS = ("a", "b", "c", "d")
+
+
+def random_mask(rng: random.Random, depth: int = 0) -> dict[str, object] | list[object]:
+    """Generate a random mask: nested dicts with `{}` leaves, and now and then a non-dict mask."""
+    if depth > 2 or rng.random() < 0.3:
+        return {} if rng.random() < 0.9 else []
+    return {key: random_mask(rng, depth + 1) for key in rng.sample(KEYS, rng.randint(0, len(KEYS)))}
+
+
+def random_data(rng: random.Random, keys: tuple[str, ...] = KEYS, depth: int = 0) -> object:
+    """Generate a random JSON-like response from `keys` and a key no mask keeps."""
+    kind = rng.random()
+    if depth > 3 or kind < 0.3:
+        return rng.choice([1, "x", None, True, 2.5])
+    if kind < 0.5:
+        return [random_data(rng, keys, depth + 1) for _ in range(rng.randint(0, 4))]
+    keys = (*keys, "junk")
+    return {key: random_data(rng, keys, depth + 1) for key in rng.sample(keys, rng.randint(0, min(len(keys), 6)))}
+
+
+def mask_keys(mask: object) -> tuple[str, ...]:
+    """Get all keys used anywhere in `mask`."""
+    if not isinstance(mask, Mapping):
+        return ()
+    return tuple(dict.fromkeys(key for key, submask in mask.items() for key in (key, *mask_keys(submask))))
+
+
+class CompiledMaskTest(unittest.TestCase):
+    """The compiled projectors must filter exactly like the recursive walk over the plain mask."""
+
+    def test_random_masks(self) -> None:
+        """Random masks give the same result compiled as walked, on random data."""
+        rng = random.Random(0)  # noqa: S311
+        for _ in range(5000):
+            mask = random_mask(rng)
+            projector = compile_mask(mask)
+            for _ in range(5):
+                data = random_data(rng)
+                assert projector(data) == mask_api_response(data, mask), (mask, data)
+
+    def test_flat_listing(self) -> None:
+        """The single comprehension for flat masks falls back to row by row projection when it has to."""
+        mask = {"a": {}, "b": {}}
+        projector = compile_mask(mask)
+        for data in (
+            [{"a": 1, "b": 2, "c": 3}, {"a": [{"x": 1}], "b": {"y": 2}}],
+            # A row that lacks a key, or is not a dict
+            [{"a": 1, "b": 2}, {"a": 1}, 3, [{"b": 1}]],
+            [],
+        ):
+            assert projector(data) == mask_api_response(data, mask), data
+
+    def test_bundled_masks(self) -> None:
+        """The masks from the masks file give the same result compiled as walked."""
+        rng = random.Random(1)  # noqa: S311
+        for name, mask in _load_masks().items():
+            projector = load_mask(name)
+            keys = mask_keys(mask)
+            for _ in range(500):
+                data = random_data(rng, keys)
+                assert projector(data) == mask_api_response(data, mask), (name, data)
+
+    def test_mask_changed_between_calls(self) -> None:
+        """A plain mask is applied as it is at the time of the call."""
+        mask: dict[str, object] = {"a": {}}
+        data = {"a": 1, "b": 2}
+        assert mask_api_response(data, mask) == {"a": 1}
+        mask["b"] = {}
+        assert mask_api_response(data, mask) == {"a": 1, "b": 2}
+
+
+if __name__ == "__main__":
+    unittest.main()